@@ -19,6 +19,11 @@ This project is shared to spread knowledge and inspire others.
 
 import serial
 import argparse
+import array
+import fcntl
+import queue
+import select
+import selectors
 import sys
 import time
 import socket
@@ -27,14 +32,61 @@ import os
 
 SOCKET_PATH = "/tmp/powersupply.sock"
 
+# Linux TIOCGSERIAL/TIOCSSERIAL ioctls and the serial_struct flag that
+# disables the USB-serial latency timer (16 ms by default on FTDI).
+TIOCGSERIAL = 0x541E
+TIOCSSERIAL = 0x541F
+ASYNC_LOW_LATENCY = 0x2000
+
 DEF_PORT = "/dev/ttyACM0"
 DEF_BAUD = 9600
 DEF_TIMEOUT = 1
 DEF_REFRESH = 1
+OFF_THRESHOLD_V = 0.01
 TESTED_DEVICES = [
     "RND 320-KWR103",
 ]
 
+# Pre-encoded wire forms of the parameterless commands, so the hot
+# paths skip the per-call string build + encode().
+CMD_VSET_Q = b"VSET?\r\n"
+CMD_ISET_Q = b"ISET?\r\n"
+CMD_VOUT_Q = b"VOUT?\r\n"
+CMD_IOUT_Q = b"IOUT?\r\n"
+CMD_IDN_Q = b"*IDN?\r\n"
+CMD_OUT_ON = b"OUT:1\r\n"
+CMD_OUT_OFF = b"OUT:0\r\n"
+CMD_LOCK_ON = b"LOCK:1\r\n"
+CMD_LOCK_OFF = b"LOCK:0\r\n"
+
+# str -> pre-encoded lookup so callers can keep passing plain command
+# strings to _serial_command.
+_STATIC_CMDS = {
+    "VSET?": CMD_VSET_Q,
+    "ISET?": CMD_ISET_Q,
+    "VOUT?": CMD_VOUT_Q,
+    "IOUT?": CMD_IOUT_Q,
+    "*IDN?": CMD_IDN_Q,
+    "OUT:1": CMD_OUT_ON,
+    "OUT:0": CMD_OUT_OFF,
+    "LOCK:1": CMD_LOCK_ON,
+    "LOCK:0": CMD_LOCK_OFF,
+}
+
+# Monitor frame, parsed once at import instead of re-compiling the
+# format specs every refresh. \033[H homes the cursor and \033[K
+# erases each rewritten line so frames overwrite in place.
+FRAME_TMPL = (
+    "\033[H\033[K================================= PSU =================================\n"
+    "\033[K  VSET: {vset:<8} V                          VOUT: {vout:<8} V\n"
+    "\033[K  ISET: {iset:<8} A                          IOUT: {iout:<8} A\n"
+    "\033[K\n"
+    "\033[K                   OUTPUT: {out:<3}      MEM: {mem}\n"
+    "\033[K=======================================================================\n"
+    "\033[KRefreshing every {refresh} seconds...  (Ctrl+C to stop)\n"
+    "\033[K"
+)
+
 RAW_COMMANDS = [
     "VSET:<voltage>",
     "VSET?",
@@ -61,27 +113,85 @@ class PowerSupply:
     ):
 
         self.refreshrate = refreshrate
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
         self.is_connected = False
         self.socket_path = SOCKET_PATH
-
+        self.no_device_check = no_device_check
+        self.confirmation_cached = False
+        self._server_running = False
+        self._sock_client = None
+        self._idn_cache = None
+        self._connection = None
+        self._fd = None
+        self._rx_buf = bytearray()
+        # Requests from other threads for the reactor thread, which is
+        # the only thread allowed to touch the serial device while the
+        # server runs.
+        self._req_q = queue.SimpleQueue()
+        self._wake_r = None
+        self._wake_w = None
+        self._stop = threading.Event()
+        self._frame_ctx = {}
+        # Last known setpoints; VSET?/ISET? only change on an explicit
+        # set, so these answer the readbacks without a serial trip.
+        self._shadow = {"VSET?": None, "ISET?": None}
+
+    @property
+    def connection(self):
+        """The serial port, opened on first use.
+
+        Opening a USB-serial device costs tens of ms of tty ioctls and
+        a DTR toggle, so invocations that never talk to the device
+        (e.g. --help) skip it entirely.
+        """
+        if self._connection is None:
+            self._open_port()
+        return self._connection
+
+    def _open_port(self):
         try:
-            self.connection = serial.Serial(
-                port=port,
-                baudrate=baudrate,
+            self._connection = serial.Serial(
+                port=self.port,
+                baudrate=self.baudrate,
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
-                timeout=timeout,
+                timeout=self.timeout,
+                # No flow control on this link; leaving the defaults
+                # costs a DSR/DTR toggle and dead time on open.
+                xonxoff=False,
+                rtscts=False,
+                dsrdtr=False,
+                inter_byte_timeout=0.01,
+                exclusive=True,
             )
             self.is_connected = True
-            self.connection.reset_input_buffer()
-            self.no_device_check = no_device_check
-            self.confirmation_cached = False
+            self._connection.reset_input_buffer()
+            self._set_low_latency()
+            self._fd = self._connection.fileno()
 
         except Exception as e:
-            print(f"{port} failure: {e}")
+            print(f"{self.port} failure: {e}")
             raise
 
+    def _set_low_latency(self):
+        """Ask the USB-serial driver to flush each USB frame immediately.
+
+        Without ASYNC_LOW_LATENCY many adapters hold replies for up to
+        16 ms per command waiting for the latency timer to expire.
+        """
+        try:
+            fd = self.connection.fileno()
+            buf = array.array("i", [0] * 32)
+            fcntl.ioctl(fd, TIOCGSERIAL, buf, True)
+            buf[4] |= ASYNC_LOW_LATENCY
+            fcntl.ioctl(fd, TIOCSSERIAL, buf)
+        except (OSError, ValueError):
+            # Not supported by this platform or driver; nothing lost.
+            pass
+
     def user_enter_button(self):
         try:
             input("\nPress Enter...")
@@ -214,16 +324,70 @@ class PowerSupply:
         return True
 
     def _serial_command(self, data):
-        if not self.is_connected:
+        if self._connection is None:
+            self._open_port()
+        elif not self.is_connected:
             return None
-        self.connection.write((data + "\r\n").encode())
-        reply = self.connection.readline().decode(errors="ignore").strip()
+        if isinstance(data, bytes):
+            payload = data
+        else:
+            payload = _STATIC_CMDS.get(data) or (data + "\r\n").encode()
+        os.write(self._fd, payload)
+        return self._read_reply()
+
+    def _read_reply(self):
+        """Read one \\r\\n-terminated reply straight from the serial fd.
+
+        pyserial stays in charge of port configuration, but its
+        write/read wrappers add lock and timeout bookkeeping per call;
+        os.read with a select() timeout skips all of that.
+
+        Reads land in a persistent buffer and exactly one line is
+        consumed per call, so replies that arrive back-to-back (the
+        common case for pipelined bursts) stay paired with their
+        commands.
+        """
+        buf = self._rx_buf
+        while b"\r\n" not in buf:
+            readable, _, _ = select.select([self._fd], [], [], self.timeout)
+            if not readable:
+                break
+            chunk = os.read(self._fd, 64)
+            if not chunk:
+                break
+            buf.extend(chunk)
+
+        line, sep, rest = buf.partition(b"\r\n")
+        if not sep:
+            # Timed out mid-line; keep the partial bytes so the reply
+            # can complete on a later call instead of going off-by-one.
+            return None
+        buf[:] = rest
+        reply = line.decode(errors="ignore").strip()
         return reply if reply else None
 
+    def _serial_commands_batch(self, cmds):
+        """Write several commands back-to-back, then read the replies in order.
+
+        The device answers pipelined queries in submission order, so one
+        write plus N reads replaces N full write/read round-trips.
+        """
+        if self._connection is None:
+            self._open_port()
+        elif not self.is_connected:
+            return [None] * len(cmds)
+        os.write(
+            self._fd,
+            b"".join(
+                c if isinstance(c, bytes) else (c + "\r\n").encode() for c in cmds
+            ),
+        )
+        return [self._read_reply() for _ in cmds]
+
     def _check_server(self):
         """Try to connect to the UNIX socket server."""
         socket_path = self.socket_path
-        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
         try:
             client.connect(socket_path)
             return client
@@ -232,14 +396,37 @@ class PowerSupply:
         except ConnectionRefusedError:
             return None
 
-    def send_command_via_socket(self, cmd):
-        client = self._check_server()
-        if client is None:
+    def _close_client_socket(self):
+        if self._sock_client is not None:
+            try:
+                self._sock_client.close()
+            except OSError:
+                pass
+            self._sock_client = None
+
+    def send_command_via_socket(self, cmd, _retry=True):
+        if self._sock_client is None:
+            client = self._check_server()
+            if client is None:
+                return None
+            self._sock_client = client
+
+        # SOCK_SEQPACKET keeps message boundaries: one sendall is one
+        # command, one recv is exactly one reply.
+        try:
+            self._sock_client.sendall(cmd.encode())
+            data = self._sock_client.recv(4096)
+        except OSError:
+            data = b""
+
+        if not data:
+            # Server went away; drop the cached connection and retry once.
+            self._close_client_socket()
+            if _retry:
+                return self.send_command_via_socket(cmd, _retry=False)
             return None
-        client.sendall((cmd + "\n").encode())
-        data = client.recv(4096).decode(errors="ignore").strip()
-        client.close()
-        return data
+
+        return data.decode(errors="ignore").strip()
 
     def start_server(self):
         """Starts UNIX domain socket server for remote control."""
@@ -250,41 +437,129 @@ class PowerSupply:
         except OSError:
             pass
 
-        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
         server.bind(socket_path)
-        server.listen(1)
+        # Deep backlog so a burst of scripted clients doesn't get
+        # connection-refused while the reactor drains the queue.
+        server.listen(128)
+        server.setblocking(False)
         self._server_socket = server
+        # Self-pipe so queued serial requests wake the reactor at once
+        # instead of waiting out the select() timeout.
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._server_running = True
 
         self._server_thread = threading.Thread(
             target=self._serve_clients, args=(server, socket_path), daemon=True
         )
         self._server_thread.start()
 
-    def _serve_clients(self, server, socket_path):
-        while True:
+    def _accept_client(self, sel, server):
+        try:
+            conn, _ = server.accept()
+        except OSError:
+            return
+        conn.setblocking(False)
+        sel.register(conn, selectors.EVENT_READ, None)
+
+    def _handle_client(self, sel, conn, _data):
+        # SOCK_SEQPACKET preserves message boundaries, so one recv is
+        # exactly one command; no buffering or newline reassembly.
+        try:
+            data = conn.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+
+        if not data:
+            sel.unregister(conn)
+            conn.close()
+            return
+
+        try:
+            cmd = data.decode(errors="ignore").strip()
+            reply = self._serial_command(cmd)
+            if cmd.startswith(("VSET:", "ISET:")):
+                # A remote set makes the shadowed readback stale.
+                self._shadow[cmd[:4] + "?"] = None
+
+            if reply is None:
+                # One-byte placeholder: an empty packet would look
+                # like EOF to the client.
+                conn.sendall(b"\n")
+            else:
+                conn.sendall(reply.encode())
+
+        except Exception as e:
+            err_msg = f"ERROR: {e}"
             try:
-                conn, _ = server.accept()
+                conn.sendall(err_msg.encode())
             except OSError:
-                break
+                pass
 
-            with conn:
-                try:
-                    data = conn.recv(1024)
-                    if not data:
-                        continue
+    def _drain_serial_requests(self):
+        while True:
+            try:
+                cmds, resp_q = self._req_q.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if isinstance(cmds, list):
+                    resp_q.put(self._serial_commands_batch(cmds))
+                else:
+                    resp_q.put(self._serial_command(cmds))
+            except Exception:
+                resp_q.put([None] * len(cmds) if isinstance(cmds, list) else None)
+
+    def _run_on_serial_thread(self, cmds):
+        """Hand serial work to the reactor thread and wait for the reply.
+
+        While the server runs, the reactor is the only thread that
+        touches the serial device, so the monitor loop and socket
+        clients never interleave mid-transaction.
+        """
+        resp_q = queue.SimpleQueue()
+        self._req_q.put((cmds, resp_q))
+        os.write(self._wake_w, b"\0")
+        try:
+            return resp_q.get(timeout=self.timeout * 5 + 1)
+        except queue.Empty:
+            return None
 
-                    cmd = data.decode(errors="ignore").strip()
-                    reply = self._serial_command(cmd)
+    def _serve_clients(self, server, socket_path):
+        sel = selectors.DefaultSelector()
+        sel.register(server, selectors.EVENT_READ, None)
+        sel.register(self._wake_r, selectors.EVENT_READ, None)
 
-                    if reply is None:
-                        conn.sendall(b"\n")
-                    else:
-                        conn.sendall((reply + "\n").encode())
+        while self._server_running:
+            try:
+                events = sel.select(timeout=0.5)
+            except OSError:
+                break
+
+            for key, _ in events:
+                if key.fileobj is server:
+                    self._accept_client(sel, server)
+                elif key.fileobj == self._wake_r:
+                    try:
+                        os.read(self._wake_r, 1024)
+                    except OSError:
+                        pass
+                else:
+                    self._handle_client(sel, key.fileobj, key.data)
 
-                except Exception as e:
-                    err_msg = f"ERROR: {e}\n"
-                    conn.sendall(err_msg.encode())
+            self._drain_serial_requests()
 
+        try:
+            sel.close()
+        except:
+            pass
+        try:
+            os.close(self._wake_r)
+        except OSError:
+            pass
         try:
             server.close()
         except:
@@ -297,10 +572,19 @@ class PowerSupply:
 
     def _execute_psu_command(self, cmd):
         if not self.confirmation_cached:
-            if self._user_confirmation():
+            if not self._user_confirmation():
                 return None
             self.confirmation_cached = True
 
+        cached = self._shadow.get(cmd)
+        if cached is not None:
+            return cached
+
+        if self._server_running:
+            # We are the monitor/server process; queue straight onto
+            # the reactor instead of going through our own socket.
+            return self._run_on_serial_thread(cmd)
+
         reply = self.send_command_via_socket(cmd)
         if reply is None:
             return self._serial_command(cmd)
@@ -308,11 +592,17 @@ class PowerSupply:
 
     def set_current(self, amps):
         cmd = f"ISET:{amps}"
-        return self._execute_psu_command(cmd)
+        reply = self._execute_psu_command(cmd)
+        if self.confirmation_cached:
+            self._shadow["ISET?"] = str(amps)
+        return reply
 
     def set_voltage(self, volts):
         cmd = f"VSET:{volts}"
-        return self._execute_psu_command(cmd)
+        reply = self._execute_psu_command(cmd)
+        if self.confirmation_cached:
+            self._shadow["VSET?"] = str(volts)
+        return reply
 
     def get_voltage_set(self):
         cmd = "VSET?"
@@ -331,8 +621,10 @@ class PowerSupply:
         return self._execute_psu_command(cmd)
 
     def get_idn(self):
-        cmd = f"*IDN?"
-        return self._execute_psu_command(cmd)
+        # Device identity never changes while the port is open.
+        if self._idn_cache is None:
+            self._idn_cache = self._execute_psu_command("*IDN?")
+        return self._idn_cache
 
     def get_all(self):
         print("Voltage set :", self.get_voltage_set())
@@ -342,19 +634,19 @@ class PowerSupply:
         print("Current out :", self.get_current_out())
 
     def output_on(self):
-        cmd = f"OUT:1"
+        cmd = "OUT:1"
         return self._execute_psu_command(cmd)
 
     def output_off(self):
-        cmd = f"OUT:0"
+        cmd = "OUT:0"
         return self._execute_psu_command(cmd)
 
     def lock_front_panel(self):
-        cmd = f"LOCK:1"
+        cmd = "LOCK:1"
         return self._execute_psu_command(cmd)
 
     def unlock_front_panel(self):
-        cmd = f"LOCK:0"
+        cmd = "LOCK:0"
         return self._execute_psu_command(cmd)
 
     def save_preset(self, slot):
@@ -371,46 +663,75 @@ class PowerSupply:
         self.confirmation_cached = True
         self.start_server()
 
+        first_frame = True
+        # Schedule against a fixed deadline so frames stay on a stable
+        # cadence no matter how long the serial queries take.
+        deadline = time.monotonic()
         try:
-            while True:
-                vset = self.get_voltage_set() or "?"
-                iset = self.get_current_set() or "?"
-                vout = self.get_voltage_out() or "?"
-                iout = self.get_current_out() or "?"
-
-                output_state = (
-                    "ON" if vout not in ("0", "0.0", "0.00", "00.000", None) else "OFF"
+            while not self._stop.is_set():
+                values = self._run_on_serial_thread(
+                    [CMD_VSET_Q, CMD_ISET_Q, CMD_VOUT_Q, CMD_IOUT_Q]
                 )
-                mem_slot = "-"
+                if values is None or None in values:
+                    # Device didn't pair all replies; query one at a time.
+                    values = [
+                        self.get_voltage_set(),
+                        self.get_current_set(),
+                        self.get_voltage_out(),
+                        self.get_current_out(),
+                    ]
+                vset, iset, vout, iout = (v or "?" for v in values)
 
-                print("\033[2J\033[H", end="")
-                print(
-                    "================================= PSU ================================="
-                )
-                print(f"  VSET: {vset:<8} V                          VOUT: {vout:<8} V")
-                print(
-                    f"  ISET: {iset:<8} A                          IOUT: {iout:<8} A\n"
-                )
-                print(
-                    f"                   OUTPUT: {output_state:<3}      MEM: {mem_slot}"
-                )
-                print(
-                    "======================================================================="
-                )
-                print(
-                    f"Refreshing every {self.refreshrate} seconds...  (Ctrl+C to stop)\n"
-                )
+                try:
+                    output_state = "ON" if float(vout) > OFF_THRESHOLD_V else "OFF"
+                except (TypeError, ValueError):
+                    output_state = "OFF"
+                mem_slot = "-"
 
-                time.sleep(self.refreshrate)
+                if first_frame:
+                    # Clear leftovers once; later frames overwrite in place.
+                    sys.stdout.write("\033[2J")
+                    sys.stdout.flush()
+                    first_frame = False
+
+                # The frame goes to the raw stdout buffer in a single
+                # write() syscall, past the line-buffered text layer.
+                ctx = self._frame_ctx
+                ctx["vset"] = vset
+                ctx["iset"] = iset
+                ctx["vout"] = vout
+                ctx["iout"] = iout
+                ctx["out"] = output_state
+                ctx["mem"] = mem_slot
+                ctx["refresh"] = self.refreshrate
+                sys.stdout.buffer.write(FRAME_TMPL.format_map(ctx).encode())
+                sys.stdout.buffer.flush()
+
+                # Clamp so a frame that overran the interval doesn't
+                # leave the deadline in the past and busy-poll the port.
+                deadline = max(deadline + self.refreshrate, time.monotonic())
+                if self._stop.wait(max(0.0, deadline - time.monotonic())):
+                    break
 
         except KeyboardInterrupt:
-            print("\nStopping monitor...")
-            self.closeConnection()
-            print("Serial connection closed.")
+            self._stop.set()
+
+        print("\nStopping monitor...")
+        self.closeConnection()
+        print("Serial connection closed.")
 
     def closeConnection(self):
+        self._server_running = False
+        self._close_client_socket()
+        if self._wake_w is not None:
+            try:
+                os.close(self._wake_w)
+            except OSError:
+                pass
+            self._wake_w = None
         try:
-            self.connection.close()
+            if self._connection is not None:
+                self._connection.close()
         finally:
             self.is_connected = False
 
@@ -474,76 +795,32 @@ if __name__ == "__main__":
         PSU.monitor()
         sys.exit(0)
 
-    if ARG.get_all:
-        print(PSU.get_all())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.get_voltage_set:
-        print(PSU.get_voltage_set())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.get_voltage_out:
-        print(PSU.get_voltage_out())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.get_current_set:
-        print(PSU.get_current_set())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.get_current_out:
-        print(PSU.get_current_out())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.set_voltage is not None:
-        result = PSU.set_voltage(ARG.set_voltage)
-        if result is not None:
-            print(result)
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.set_current is not None:
-        result = PSU.set_current(ARG.set_current)
+    # Argument name -> handler. Flags fire when True; value options
+    # fire when not None and pass their value to the handler.
+    DISPATCH = [
+        ("get_all", PSU.get_all),
+        ("get_voltage_set", PSU.get_voltage_set),
+        ("get_voltage_out", PSU.get_voltage_out),
+        ("get_current_set", PSU.get_current_set),
+        ("get_current_out", PSU.get_current_out),
+        ("set_voltage", PSU.set_voltage),
+        ("set_current", PSU.set_current),
+        ("on", PSU.output_on),
+        ("off", PSU.output_off),
+        ("lock", PSU.lock_front_panel),
+        ("unlock", PSU.unlock_front_panel),
+        ("save", PSU.save_preset),
+        ("load", PSU.recall_preset),
+        ("idn", PSU.get_idn),
+    ]
+
+    for attr, handler in DISPATCH:
+        value = getattr(ARG, attr)
+        if value is None or value is False:
+            continue
+
+        result = handler() if value is True else handler(value)
         if result is not None:
             print(result)
         PSU.closeConnection()
         sys.exit(0)
-
-    if ARG.on:
-        print(PSU.output_on())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.off:
-        print(PSU.output_off())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.lock:
-        print(PSU.lock_front_panel())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.unlock:
-        print(PSU.unlock_front_panel())
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.save is not None:
-        print(PSU.save_preset(ARG.save))
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.load is not None:
-        print(PSU.recall_preset(ARG.load))
-        PSU.closeConnection()
-        sys.exit(0)
-
-    if ARG.idn:
-        print(PSU.get_idn())
-        PSU.closeConnection()
-        sys.exit(0)